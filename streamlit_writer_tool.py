@@ -1,13 +1,16 @@
+import io
 import os
 import re
+import regex
+from functools import lru_cache
 import streamlit as st
 from collections import Counter
+from dataclasses import dataclass
 from datetime import datetime
 from nltk.tokenize.punkt import PunktSentenceTokenizer
-from nltk.tokenize import wordpunct_tokenize
 from nltk.corpus import stopwords
-import textstat
 from docx import Document
+from docx.oxml.ns import qn
 from striprtf.striprtf import rtf_to_text
 import nltk
 import requests
@@ -20,9 +23,18 @@ PERMALINK    = st.secrets["GUMROAD_PRODUCT_PERMALINK"]
 if "pro_unlocked" not in st.session_state:
     st.session_state.pro_unlocked = False
 
-def verify_license(license_key: str) -> bool:
-    """Verify a Gumroad license key via their API."""
-    resp = requests.post(
+@st.cache_resource
+def _http_session() -> requests.Session:
+    return requests.Session()
+
+class _LicenseRejected(Exception):
+    pass
+
+# Only successful checks are cached: st.cache_data does not store a call that
+# raises, so a rejected or transiently failing key is re-checked next time.
+@st.cache_data(ttl=3600, show_spinner=False)
+def _verified_license(license_key: str) -> bool:
+    resp = _http_session().post(
         "https://api.gumroad.com/v2/licenses/verify",
         data={
             "product_permalink": PERMALINK,
@@ -31,11 +43,28 @@ def verify_license(license_key: str) -> bool:
         },
         timeout=10
     ).json()
-    return resp.get("success", False)
+    if not resp.get("success", False):
+        raise _LicenseRejected(license_key)
+    return True
+
+def verify_license(license_key: str) -> bool:
+    """Verify a Gumroad license key via their API."""
+    try:
+        return _verified_license(license_key)
+    except _LicenseRejected:
+        return False
 
 # ── NLTK SETUP ───────────────────────────────────────────────
-nltk.download('punkt')
-nltk.download('stopwords')
+@st.cache_resource
+def _ensure_nltk_data() -> None:
+    for pkg, path in [('punkt', 'tokenizers/punkt'), ('stopwords', 'corpora/stopwords')]:
+        try:
+            nltk.data.find(path)
+        except LookupError:
+            nltk.download(pkg, quiet=True, raise_on_error=True)
+
+_ensure_nltk_data()
+_STOPWORDS = frozenset(stopwords.words('english'))
 
 # ── CONSTANTS & PRESETS ─────────────────────────────────────
 FILLER_WORDS = ["just", "really", "very", "that", "actually",
@@ -51,6 +80,21 @@ CLICHES = [
     "barking up the wrong tree", "blood ran cold", "fit as a fiddle"
 ]
 
+_SMART_PUNCT = str.maketrans({"“": "\"", "”": "\"", "‘": "'", "’": "'"})
+_WORDPUNCT_RE = re.compile(r'\w+|[^\w\s]+')
+_SYLLABLE_RE = re.compile(r'[aeiouy]+')
+_FILLER_SET = frozenset(FILLER_WORDS)
+_FILLER_RE = re.compile(
+    r'\b(' + '|'.join(map(re.escape, FILLER_WORDS)) + r')\b', re.IGNORECASE)
+_PASSIVE_RE = re.compile(
+    r'\b(was|were|is being|are being|has been|have been|had been)\b\s+\w+ed\b',
+    re.IGNORECASE)
+_DIALOGUE_RE = re.compile(r'[“"]([^“”"]+)[”"]')
+# The regex module's possessive quantifiers stop backtracking on unbalanced
+# quotes; stdlib re only gained them in Python 3.11.
+_ATTRIB_RE = regex.compile(
+    r'"[^"]++"\s++(?:said|asked|replied|whispered|shouted|cried|muttered|yelled|snapped|called)\s++([A-Z][a-zA-Z]*+)')
+
 STYLE_PRESETS = {
     "Gritty": {
         "emphasis": "Cliché detection, passive voice, long sentences",
@@ -76,40 +120,72 @@ STYLE_PRESETS = {
 
 # ── CORE FUNCTIONS ───────────────────────────────────────────
 
+_PUNKT = PunktSentenceTokenizer()
+
+@lru_cache(maxsize=4)
+def _lowered(text: str) -> str:
+    # _scan and find_cliches share one lower-cased copy of the manuscript.
+    return text.lower()
+
+@st.cache_data(show_spinner=False, max_entries=8)
 def clean_text(text: str) -> str:
-    text = text.replace("“", "\"").replace("”", "\"")
-    text = text.replace("‘", "'").replace("’", "'")
-    text = text.replace("--", "—")
+    text = text.translate(_SMART_PUNCT).replace("--", "—")
     return ' '.join(text.split())
 
+@dataclass(frozen=True)
+class _Scan:
+    sentences: tuple
+    word_counts: tuple
+    filler_counts: tuple
+    passive: tuple
+    total_words: int
+    syllables: int
+    fillers: Counter
+    top_words: Counter
+
+# Streamlit re-executes this script on every rerun, which would empty an
+# lru_cache; cache_resource keeps the frozen _Scan without pickling it.
+@st.cache_resource(max_entries=8, show_spinner=False)
+def _scan(text: str) -> _Scan:
+    sentences = tuple(_PUNKT.tokenize(text))
+    # map() keeps the per-sentence scoring in C; only the regexes do real work.
+    word_counts = tuple(map(len, map(_WORDPUNCT_RE.findall, sentences)))
+    filler_counts = tuple(map(len, map(_FILLER_RE.findall, sentences)))
+    passive = tuple(map(bool, map(_PASSIVE_RE.search, sentences)))
+    lowered = _lowered(text)
+    words = Counter(w for w in _WORDPUNCT_RE.findall(lowered) if w.isalpha())
+    syllables = sum(len(_SYLLABLE_RE.findall(w)) * c for w, c in words.items())
+    fillers = Counter({w: c for w, c in words.items() if w in _FILLER_SET})
+    top_words = Counter({w: c for w, c in words.items() if w not in _STOPWORDS})
+    return _Scan(sentences, word_counts, filler_counts, passive,
+                 len(text.split()), syllables, fillers, top_words)
+
 def suggest_improvements(text: str) -> str:
-    tokenizer = PunktSentenceTokenizer()
-    sentences = tokenizer.tokenize(text)
+    scan = _scan(text)
     suggestions = []
-    for i, sentence in enumerate(sentences):
+    for i, sentence in enumerate(scan.sentences):
         issues = []
-        if len(wordpunct_tokenize(sentence)) > 30:
+        if scan.word_counts[i] > 30:
             issues.append("⚠️ Consider breaking this long sentence into two or more.")
-        if re.search(r'\b(was|were|is being|are being|has been|have been|had been)\b\s+\w+ed\b', sentence):
+        if scan.passive[i]:
             issues.append("💡 Try rephrasing in active voice.")
-        filler_count = sum(sentence.lower().count(fw) for fw in FILLER_WORDS)
-        if filler_count > 2:
+        if scan.filler_counts[i] > 2:
             issues.append("✂️ This line may be padded with filler words.")
         if issues:
             suggestions.append(f"\nSentence {i+1}:\n“{sentence.strip()}”\n" + "\n".join(issues))
     return "\n".join(suggestions) if suggestions else "✅ No smart suggestions needed — looking solid!"
 
 def detect_passive_voice(text: str):
-    tokenizer = PunktSentenceTokenizer()
-    sentences = tokenizer.tokenize(text)
-    passive = []
-    pattern = re.compile(r'\b(was|were|is being|are being|has been|have been|had been)\b\s+\w+ed\b', re.IGNORECASE)
-    for i, sentence in enumerate(sentences):
-        if pattern.search(sentence):
-            passive.append((i+1, sentence.strip()))
-    return passive
+    scan = _scan(text)
+    return [(i+1, s.strip()) for i, s in enumerate(scan.sentences) if scan.passive[i]]
 
+@st.cache_data(show_spinner=False, max_entries=8)
 def analyze_text(text: str, style="None") -> str:
+    scan = _scan(text)
+    n_sent = len(scan.sentences)
+    avg = scan.total_words / n_sent if n_sent else 0.0
+    grade = (0.39 * avg + 11.8 * scan.syllables / scan.total_words - 15.59
+             if scan.total_words else 0.0)
     report = []
     if style in STYLE_PRESETS:
         report += [
@@ -119,26 +195,23 @@ def analyze_text(text: str, style="None") -> str:
         ]
     report += [
         "📊 Analysis Report:",
-        f"• Total words: {len(text.split())}",
-        f"• Total sentences: {textstat.sentence_count(text)}",
-        f"• Avg sentence length: {textstat.words_per_sentence(text):.2f} words",
-        f"• Reading grade level: {textstat.flesch_kincaid_grade(text):.2f}", ""
+        f"• Total words: {scan.total_words}",
+        f"• Total sentences: {n_sent}",
+        f"• Avg sentence length: {avg:.2f} words",
+        f"• Reading grade level: {grade:.2f}", ""
     ]
     report.append("🔎 Common Filler Words Found:")
     for w in FILLER_WORDS:
-        c = text.lower().split().count(w)
+        c = scan.fillers[w]
         if c > 0:
             report.append(f"   - {w}: {c}")
     report.append("\n⚠️ Long Sentences (over 30 words):")
-    sentences = PunktSentenceTokenizer().tokenize(text)
-    for i, s in enumerate(sentences):
-        wc = len(wordpunct_tokenize(s))
+    for i, s in enumerate(scan.sentences):
+        wc = scan.word_counts[i]
         if wc > 30:
             report.append(f"\nSentence {i+1} ({wc} words):\n{s}")
     report.append("\n📈 Top 5 Most Frequent Words (excl. stopwords):")
-    words = [w for w in wordpunct_tokenize(text.lower())
-             if w.isalpha() and w not in stopwords.words('english')]
-    for w, c in Counter(words).most_common(5):
+    for w, c in scan.top_words.most_common(5):
         report.append(f"   - {w}: {c}")
     report.append("\n🕵️ Potential Passive Voice Sentences:")
     passive = detect_passive_voice(text)
@@ -146,25 +219,51 @@ def analyze_text(text: str, style="None") -> str:
     report += ["\n🤖 Smart Suggestions:", suggest_improvements(text)]
     return "\n".join(report)
 
+@st.cache_data(show_spinner=False, max_entries=8)
 def extract_dialogue(text: str) -> str:
-    matches = re.findall(r'[“"]([^“”"]+)[”"]', text)
+    matches = _DIALOGUE_RE.findall(text)
     return "\n".join(m.strip() for m in matches if m.strip())
 
+@st.cache_data(show_spinner=False, max_entries=8)
 def dialogue_by_character(text: str) -> str:
-    matches = re.findall(
-        r'"[^"]+?"\s+(?:said|asked|replied|whispered|shouted|cried|muttered|yelled|snapped|called)\s+([A-Z][a-zA-Z]*)',
-        text)
+    matches = _ATTRIB_RE.findall(text)
     if not matches:
         return "No named characters found."
     counts = Counter(matches).most_common()
     return "🧍 Dialogue by Character:\n" + "\n".join(f"   - {n}: {c} lines" for n, c in counts)
 
+@st.cache_data(show_spinner=False, max_entries=8)
 def find_cliches(text: str) -> str:
-    found = [f"• {ph}" for ph in CLICHES if ph in text.lower()]
+    lowered = _lowered(text)
+    found = [f"• {ph}" for ph in CLICHES if ph in lowered]
     return "\n💣 Clichés Found:\n" + "\n".join(found) if found else "✅ No clichés found!"
 
 def load_docx(file) -> str:
-    return "\n".join(p.text for p in Document(file).paragraphs)
+    # Walk the body's <w:p> elements directly rather than building the
+    # Document.paragraphs list of Paragraph proxies.
+    body = Document(file).element.body
+    return "\n".join(p.text for p in body.iterchildren(qn("w:p")))
+
+def _decode(file_bytes: bytes) -> str:
+    # Most uploads are UTF-8; older Word/WordPad exports are usually cp1252.
+    try:
+        return file_bytes.decode("utf-8")
+    except UnicodeDecodeError:
+        return file_bytes.decode("cp1252", "replace")
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def _extract(file_bytes: bytes, name: str) -> str:
+    ext = os.path.splitext(name)[1].lower()
+    if ext == ".txt":
+        return _decode(file_bytes) + "\n"
+    elif ext == ".docx":
+        return load_docx(io.BytesIO(file_bytes)) + "\n"
+    elif ext == ".rtf":
+        return rtf_to_text(_decode(file_bytes)) + "\n"
+    return ""
+
+def _ingest(uf) -> str:
+    return _extract(uf.getvalue(), uf.name)
 
 def export_full_report(text: str, style="None") -> str:
     now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -231,17 +330,7 @@ def main():
         uploaded_files = [uploaded_file] if uploaded_file else []
 
     # ── PROCESS UPLOADED CONTENT ─────────────────────────
-    raw_text = ""
-    for uf in uploaded_files:
-        if uf is None:
-            continue
-        ext = os.path.splitext(uf.name)[1].lower()
-        if ext == ".txt":
-            raw_text += uf.read().decode("utf-8") + "\n"
-        elif ext == ".docx":
-            raw_text += load_docx(uf) + "\n"
-        elif ext == ".rtf":
-            raw_text += rtf_to_text(uf.read().decode("utf-8")) + "\n"
+    raw_text = "".join(_ingest(uf) for uf in uploaded_files if uf is not None)
 
     if raw_text:
         cleaned = clean_text(raw_text)